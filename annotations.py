@@ -2,17 +2,80 @@
 Handles the extraction of highlight annotations from PDF files.
 """
 import fitz  # PyMuPDF
+import html
+import mmap
+import os
 import re
-from typing import List, Optional
-from pydantic import BaseModel
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
-class Annotation(BaseModel):
-    """Data model for a single highlight annotation."""
+# Runs of spaces/tabs inside a line of annotation text
+_TAB_SPACE_RE = re.compile(r"[\t ]+")
+# CR → LF, NBSP → space; zero-width space, BOM and soft hyphen are dropped
+_SANITIZE_TABLE = str.maketrans({
+    "\r": "\n",
+    "\xa0": " ",
+    "\u200b": "",
+    "\ufeff": "",
+    "\u00ad": "",
+})
+
+# PDFs at least this large are memory-mapped rather than read through a file
+# stream
+_MMAP_MIN_BYTES = 4 * 1024 * 1024
+
+# Highlight colors repeat heavily; cache the RGB float -> hex conversion
+_COLOR_CACHE: Dict[Tuple[float, ...], str] = {}
+
+
+def _rgb_to_hex(rgb) -> str:
+    """Convert PyMuPDF RGB floats (0-1) to a ``#rrggbb`` string."""
+    key = tuple(rgb)
+    color = _COLOR_CACHE.get(key)
+    if color is None:
+        color = _COLOR_CACHE[key] = '#%02x%02x%02x' % (
+            int(rgb[0] * 255), int(rgb[1] * 255), int(rgb[2] * 255)
+        )
+    return color
+
+def sanitize_text(s: Optional[str]) -> str:
+    """Normalize highlight text or a note into a single clean line.
+
+    Unescapes HTML entities, drops zero-width/soft-hyphen/BOM characters,
+    turns NBSP into a space, trims each line, collapses runs of spaces/tabs
+    and joins the lines with single spaces.
+    """
+    if s is None:
+        return ""
+    # HTML entities → characters (e.g., &amp; → &)
+    s = html.unescape(str(s))
+    # Normalize newlines and spaces in one pass; a CRLF becomes two LFs,
+    # which leaves an empty line that the join below drops
+    s = s.translate(_SANITIZE_TABLE)
+    # Trim each line and collapse intra-line runs of spaces/tabs, then join with a single space
+    lines = [_TAB_SPACE_RE.sub(" ", ln.strip()) for ln in s.split("\n")]
+    s = " ".join([ln for ln in lines if ln])
+    return s.strip()
+
+@dataclass(slots=True)
+class Annotation:
+    """Data model for a single highlight annotation.
+
+    ``text`` and ``note`` hold sanitized text (see ``sanitize_text``).
+    """
     text: str
     page_number: int
     color: Optional[str] = None
     note: Optional[str] = None
 
+@dataclass(slots=True)
+class ExtractResult:
+    """Annotations plus the PDF's document metadata, read from one open."""
+    annotations: List[Annotation]
+    metadata: Dict[str, Any]
+
 def _quads_to_rects(vertices) -> List[fitz.Rect]:
     """Convert an annotation's quad vertices into a list of clip rects.
 
@@ -23,111 +86,216 @@ def _quads_to_rects(vertices) -> List[fitz.Rect]:
     if not vertices:
         return rects
     pts = list(vertices)
-    # Case A: flat list of numbers [x0,y0,x1,y1,x2,y2,x3,y3,...]
-    if pts and isinstance(pts[0], (int, float)):
-        for i in range(0, len(pts), 8):
-            quad = pts[i:i+8]
-            if len(quad) < 8:
-                break
-            xs = quad[0::2]
-            ys = quad[1::2]
-            rects.append(fitz.Rect(min(xs), min(ys), max(xs), max(ys)))
-        return rects
-    # Case B: list of points [(x,y), (x,y), ...] or fitz.Point
-    def _px(p):
-        return getattr(p, 'x', p[0])
-    def _py(p):
-        return getattr(p, 'y', p[1])
-    for i in range(0, len(pts), 4):
-        quad_pts = pts[i:i+4]
-        if len(quad_pts) < 4:
-            break
-        xs = [_px(p) for p in quad_pts]
-        ys = [_py(p) for p in quad_pts]
-        rects.append(fitz.Rect(min(xs), min(ys), max(xs), max(ys)))
+    if isinstance(pts[0], (int, float)):
+        # Case A: flat list of numbers [x0,y0,x1,y1,x2,y2,x3,y3,...]
+        xs = pts[0::2]
+        ys = pts[1::2]
+    else:
+        # Case B: list of points [(x,y), (x,y), ...] or fitz.Point
+        xs = [p[0] for p in pts]
+        ys = [p[1] for p in pts]
+    # Split coordinates once, then take each quad's extent from 4-point slices;
+    # a trailing partial quad is ignored
+    for i in range(0, min(len(xs), len(ys)) - 3, 4):
+        qx = xs[i:i+4]
+        qy = ys[i:i+4]
+        rects.append(fitz.Rect(min(qx), min(qy), max(qx), max(qy)))
     return rects
 
 
-def extract_annotations(pdf_path: str) -> List[Annotation]:
+def _reading_order_key(rect: fitz.Rect) -> Tuple[float, float]:
+    """Sort key placing rects top-to-bottom, then left-to-right."""
+    return (round(rect.y0, 2), round(rect.x0, 2))
+
+
+def _index_words(words) -> Tuple[List[float], List[int]]:
+    """Build a y-sorted index over page words for fast rect lookups.
+
+    Returns the sorted word center y-coordinates alongside the matching word
+    positions, so a quad only has to inspect the words in its vertical band.
     """
-    Extracts highlight annotations from a PDF file.
+    centers = sorted(((w[1] + w[3]) / 2, i) for i, w in enumerate(words))
+    return [cy for cy, _ in centers], [i for _, i in centers]
 
-    Args:
-        pdf_path: The path to the PDF file.
 
-    Returns:
-        A list of Annotation objects.
+def _words_in_rect(words, index: Tuple[List[float], List[int]], rect: fitz.Rect) -> str:
+    """Join the page words whose center point falls inside ``rect``.
+
+    ``words`` are the tuples returned by ``page.get_text("words")``, already
+    in reading order, and ``index`` is built by ``_index_words``. A
+    center-point test avoids picking up neighbouring words that only touch
+    the quad's edge.
+    """
+    ys, order = index
+    lo = bisect_left(ys, rect.y0)
+    hi = bisect_right(ys, rect.y1)
+    hits: List[int] = []
+    for i in order[lo:hi]:
+        x0, _, x1 = words[i][:3]
+        if rect.x0 <= (x0 + x1) / 2 <= rect.x1:
+            hits.append(i)
+    # Restore reading order for words gathered from the y-band
+    hits.sort()
+    return " ".join(words[i][4] for i in hits)
+
+
+@contextmanager
+def _open_pdf(pdf_path: str):
+    """Open ``pdf_path`` with PyMuPDF and close it on exit.
+
+    Large ``.pdf`` files are memory-mapped and handed to MuPDF as an
+    in-memory stream (no copy), so xref and object reads become page-cache
+    hits instead of seek/read calls.
+    """
+    if (
+        not pdf_path.lower().endswith(".pdf")
+        or os.path.getsize(pdf_path) < _MMAP_MIN_BYTES
+    ):
+        doc = fitz.open(pdf_path)
+        try:
+            yield doc
+        finally:
+            doc.close()
+        return
+
+    with open(pdf_path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mm)
+    try:
+        doc = fitz.open(stream=view, filetype="pdf")
+        try:
+            yield doc
+        finally:
+            doc.close()
+    finally:
+        # The view must be released before the mapping can be closed
+        view.release()
+        mm.close()
+
+
+def _annotated_pages(doc) -> List[int]:
+    """Return the 0-based indices of pages whose page object has ``/Annots``.
+
+    Reads the page dictionaries straight from the xref table, so pages
+    without annotations are never loaded or parsed.
     """
-    doc = fitz.open(pdf_path)
+    if not doc.is_pdf:
+        return list(range(doc.page_count))
+    pages: List[int] = []
+    for pno in range(doc.page_count):
+        kind, value = doc.xref_get_key(doc.page_xref(pno), "Annots")
+        if kind == "null" or value.replace(" ", "") == "[]":
+            continue
+        pages.append(pno)
+    return pages
+
+
+def _extract_from_doc(doc, page_indices: Sequence[int]) -> List[Annotation]:
+    """Extract highlight annotations from already-open ``doc``."""
     highlights = []
 
-    for page_num, page in enumerate(doc, start=1):
-        if not page.annots():
+    for pno in page_indices:
+        page = doc.load_page(pno)
+        page_num = pno + 1
+        # annots() returns a fresh generator each call; walk it only once.
+        # Filtering by type in MuPDF skips links, form fields, notes, etc.
+        annots = list(page.annots(types=(fitz.PDF_ANNOT_HIGHLIGHT,)))
+        if not annots:
             continue
 
-        for annot in page.annots():
-            if annot.type[0] == 8:  # Highlight annotation
-                # Prefer extracting text via quad rects (most reliable for highlights)
-                text_parts: List[str] = []
-
-                vertices = getattr(annot, "vertices", None)
-                rects: List[fitz.Rect] = []
-                if vertices:
-                    rects = _quads_to_rects(vertices)
-
-                # Fallback: some versions expose 'quads' as list of fitz.Quad
-                if not rects and hasattr(annot, "quads") and annot.quads:
-                    try:
-                        rects = [q.rect for q in annot.quads]
-                    except Exception:
-                        rects = []
-
-                # As a last resort, use the annotation's bounding rect
-                if not rects and hasattr(annot, "rect") and annot.rect:
-                    rects = [annot.rect]
-
-                # Sort rects by reading order: top-to-bottom, then left-to-right
-                rects.sort(key=lambda r: (round(r.y0, 2), round(r.x0, 2)))
-
-                for r in rects:
-                    try:
-                        clip_text = page.get_text("text", clip=r) or ""
-                    except Exception:
-                        clip_text = ""
-                    if clip_text:
-                        text_parts.append(clip_text)
-
-                highlighted_text = " ".join(part.strip() for part in text_parts if part.strip())
-
-                # Clean up text: replace single newlines with spaces, but keep double newlines
-                cleaned_text = re.sub(r'(?<!\n)\n(?!\n)', ' ', highlighted_text)
-
-                # Get annotation note (comment)
-                info = annot.info
-                note = info.get("content", "") if info else ""
-
-                # Get highlight color (stroke preferred, fallback to fill)
-                color = None
+        # Parse the page text once; every highlight quad is matched against
+        # this word list instead of re-extracting text per clip
+        textpage = page.get_textpage()
+        words = page.get_text("words", textpage=textpage)
+        word_index = _index_words(words)
+
+        for annot in annots:
+            # Prefer extracting text via quad rects (most reliable for highlights)
+            text_parts: List[str] = []
+
+            vertices = getattr(annot, "vertices", None)
+            rects: List[fitz.Rect] = []
+            if vertices:
+                rects = _quads_to_rects(vertices)
+
+            # Fallback: some versions expose 'quads' as list of fitz.Quad
+            if not rects and hasattr(annot, "quads") and annot.quads:
                 try:
-                    if annot.colors:
-                        stroke_color = annot.colors.get("stroke")
-                        fill_color = annot.colors.get("fill")
-                        rgb = stroke_color or fill_color
-                        if rgb and len(rgb) == 3:
-                            color = '#%02x%02x%02x' % (
-                                int(rgb[0] * 255), int(rgb[1] * 255), int(rgb[2] * 255)
-                            )
+                    rects = [q.rect for q in annot.quads]
                 except Exception:
-                    pass
-
-                highlights.append(
-                    Annotation(
-                        text=cleaned_text.strip(),
-                        page_number=page_num,
-                        color=color,
-                        note=note.strip(),
-                    )
+                    rects = []
+
+            # As a last resort, use the annotation's bounding rect
+            if not rects and hasattr(annot, "rect") and annot.rect:
+                rects = [annot.rect]
+
+            # Sort rects by reading order: top-to-bottom, then left-to-right
+            if len(rects) > 1:
+                rects.sort(key=_reading_order_key)
+
+            for r in rects:
+                clip_text = _words_in_rect(words, word_index, r)
+                if clip_text:
+                    text_parts.append(clip_text)
+
+            # Words are joined with spaces, so the text is already a single
+            # flowing line with no newlines left to clean up
+            highlighted_text = " ".join(part.strip() for part in text_parts if part.strip())
+
+            # Get annotation note (comment)
+            info = annot.info
+            note = info.get("content", "") if info else ""
+
+            # Get highlight color (stroke preferred, fallback to fill)
+            color = None
+            try:
+                if annot.colors:
+                    stroke_color = annot.colors.get("stroke")
+                    fill_color = annot.colors.get("fill")
+                    rgb = stroke_color or fill_color
+                    if rgb and len(rgb) == 3:
+                        color = _rgb_to_hex(rgb)
+            except Exception:
+                pass
+
+            highlights.append(
+                Annotation(
+                    text=sanitize_text(highlighted_text),
+                    page_number=page_num,
+                    color=color,
+                    note=sanitize_text(note),
                 )
+            )
+
+        # Release page-derived objects before loading the next page so
+        # MuPDF can reclaim their memory on long documents
+        del annots, textpage, words, word_index, page
 
-    doc.close()
     return highlights
+
+
+def extract_annotations(
+    pdf_path: str,
+    return_metadata: bool = False,
+) -> Union[List[Annotation], ExtractResult]:
+    """
+    Extracts highlight annotations from a PDF file.
+
+    Args:
+        pdf_path: The path to the PDF file.
+        return_metadata: When True, also return ``doc.metadata`` from the
+            same document handle, so callers need not reopen the PDF.
+
+    Returns:
+        A list of Annotation objects, in page order, or an ExtractResult
+        wrapping that list and the metadata when ``return_metadata`` is set.
+    """
+    with _open_pdf(pdf_path) as doc:
+        metadata = doc.metadata or {}
+        # Extract from the handle used for the pre-scan rather than opening
+        # and parsing the file a second time
+        annotations = _extract_from_doc(doc, _annotated_pages(doc))
+
+    if return_metadata:
+        return ExtractResult(annotations, metadata)
+    return annotations
@@ -2,23 +2,134 @@
 Handles BibTeX parsing and metadata matching.
 """
 import bibtexparser
-from bibtexparser.bparser import BibTexParser
-from bibtexparser.customization import author, convert_to_unicode
-from thefuzz import fuzz
+import os
+import re
+from functools import lru_cache
+from rapidfuzz import fuzz, process, utils
 from typing import List, Optional, Dict, Any
 
-def load_bibtex(bibtex_path: str) -> bibtexparser.bibdatabase.BibDatabase:
+# bibtexparser v2 exposes parse_string/Library; v1 exposes bparser/BibDatabase
+_BIBTEXPARSER_V2 = hasattr(bibtexparser, "parse_string")
+
+# Bump when load_bibtex's output for an unchanged file changes (decoding,
+# which entries are kept), so pickles made by older code are not reused
+_PARSE_FORMAT_VERSION = 1
+
+if _BIBTEXPARSER_V2:
+    from pylatexenc.latex2text import LatexNodes2Text
+
+    _LATEX_TO_TEXT = LatexNodes2Text()
+    # Only fields the pipeline reads are LaTeX-decoded; decoding every field
+    # (e.g. long abstracts and keywords) is far slower than parsing itself
+    _LATEX_FIELDS = frozenset(("title", "shorttitle", "author", "editor"))
+
+    class BibDatabase:
+        """Minimal stand-in for bibtexparser v1's BibDatabase.
+
+        ``entries`` holds one dict per entry with lowercase field names plus
+        ``ID`` and ``ENTRYTYPE``, the v1 layout the matchers rely on.
+        """
+
+        def __init__(self, entries: Optional[List[Dict[str, Any]]] = None):
+            self.entries: List[Dict[str, Any]] = entries or []
+else:
+    from bibtexparser.bibdatabase import BibDatabase
+    from bibtexparser.bparser import BibTexParser
+    from bibtexparser.customization import convert_to_unicode
+
+_INITIAL_RE = re.compile(r'\b([A-Z])\.\b')
+_AND_RE = re.compile(r"\s+and\s+")
+_WS_RE = re.compile(r"\s+")
+_YEAR_RE = re.compile(r'\b(\d{4})\b')
+# Title separators, applied after colons become " – ": a spaced dash, or a
+# plain whitespace run (collapsed to a single space). Handling colons first
+# keeps runs of adjacent separators identical to the old replace/sub chain
+_TITLE_SEP_RE = re.compile(r"\s+[-–—]\s+|\s+")
+_SHORT_TITLE_SPLIT_RE = re.compile(r'[:–-]')
+_EXT_RE = re.compile(r"\.[a-z0-9]{1,5}$")
+_CONTINUATION_RE = re.compile(r"\n[ \t]+")
+_BRACE_TRANS = str.maketrans('', '', '{}')
+
+
+def _fuzz_key(text: str) -> str:
+    """Preprocess a string for fuzzy matching (lowercase, alphanumerics only)."""
+    return utils.default_process(text)
+
+
+def _token_set_score(a: str, b: str) -> int:
+    """Token-set similarity (0-100) between two ``_fuzz_key``-processed strings."""
+    return int(round(fuzz.token_set_ratio(a, b)))
+
+
+def _token_set_scores(query: str, choices: List[str], score_cutoff: float) -> Dict[int, int]:
+    """Score ``query`` against every choice in one batch call.
+
+    ``choices`` must already be ``_fuzz_key``-processed; the query is
+    processed here. Returns ``{choice_index: score}`` for choices scoring at
+    least ``score_cutoff``; scores are rounded to integers.
+    """
+    results = process.extract(
+        _fuzz_key(query),
+        choices,
+        scorer=fuzz.token_set_ratio,
+        processor=None,
+        score_cutoff=score_cutoff,
+        limit=None,
+    )
+    return {idx: int(round(score)) for _, score, idx in results}
+
+def _parse_bibtex(bibtex_str: str) -> BibDatabase:
+    """Parse BibTeX source with whichever bibtexparser major version is installed."""
+    if not _BIBTEXPARSER_V2:
+        parser = BibTexParser(common_strings=True)
+        parser.customization = convert_to_unicode
+        return bibtexparser.loads(bibtex_str, parser=parser)
+
+    library = bibtexparser.parse_string(bibtex_str)
+    entries: List[Dict[str, Any]] = []
+    for entry in library.entries:
+        fields: Dict[str, Any] = {}
+        for field in entry.fields:
+            key = field.key.lower()
+            value = field.value
+            if isinstance(value, str):
+                # Drop the indentation of wrapped lines, as v1 did
+                value = _CONTINUATION_RE.sub("\n", value)
+                if key in _LATEX_FIELDS and "\\" in value:
+                    value = _LATEX_TO_TEXT.latex_to_text(value)
+                value = _strip_braces(value)
+            fields[key] = value
+        fields["ENTRYTYPE"] = entry.entry_type.lower()
+        fields["ID"] = entry.key
+        entries.append(fields)
+    return BibDatabase(entries)
+
+def load_bibtex(bibtex_path: str) -> BibDatabase:
     """
     Loads and parses a BibTeX/BibLaTeX file.
 
     Uses latexcodec when available to decode LaTeX accents and macros to
-    Unicode for better downstream handling.
+    Unicode for better downstream handling. Parses with bibtexparser v2 when
+    installed (faster), otherwise with v1; both yield the same entry dicts.
+
+    Parsed databases are memoized per process on (path, mtime, size), so
+    repeated calls for an unchanged file return the same object. Callers
+    must treat the result as read-only.
 
     Args:
         bibtex_path: The path to the BibTeX/BibLaTeX file.
 
     Returns:
-        A BibTexDatabase object.
+        A BibDatabase object.
+    """
+    path = os.path.abspath(bibtex_path)
+    st = os.stat(path)
+    return _load_bibtex_cached(path, st.st_mtime_ns, st.st_size)
+
+@lru_cache(maxsize=4)
+def _load_bibtex_cached(bibtex_path: str, mtime_ns: int, size: int) -> BibDatabase:
+    """
+    Parses ``bibtex_path``; ``mtime_ns`` and ``size`` only key the cache.
     """
     # Try to register latexcodec (no-op if unavailable)
     try:
@@ -32,33 +143,29 @@ def load_bibtex(bibtex_path: str) -> bibtexparser.bibdatabase.BibDatabase:
     for enc in ("latex", "utf-8"):
         try:
             with open(bibtex_path, 'r', encoding=enc) as bibtex_file:
-                parser = BibTexParser(common_strings=True)
-                parser.customization = convert_to_unicode
-                bib_database = bibtexparser.load(bibtex_file, parser=parser)
+                bib_database = _parse_bibtex(bibtex_file.read())
+                _prepared_fields(bib_database)
                 return bib_database
         except (LookupError, UnicodeError, ValueError):
             # Codec unavailable or unable to decode the file; try next.
             continue
     # Final fallback: open default and parse
     with open(bibtex_path, 'r') as bibtex_file:
-        parser = BibTexParser(common_strings=True)
-        parser.customization = convert_to_unicode
-        bib_database = bibtexparser.load(bibtex_file, parser=parser)
+        bib_database = _parse_bibtex(bibtex_file.read())
+        _prepared_fields(bib_database)
         return bib_database
 
-import re
-
 def _normalize_initials(name: str) -> str:
     """
     Removes periods from initials in a name, e.g., "H." -> "H".
     """
     # Replace any single uppercase letter followed by a period with just the letter
-    return re.sub(r'\b([A-Z])\.\b', r'\1', name)
+    return _INITIAL_RE.sub(r'\1', name)
 
 
 def _strip_braces(text: str) -> str:
     """Remove surrounding braces often present in BibTeX fields."""
-    return text.replace('{', '').replace('}', '')
+    return text.translate(_BRACE_TRANS)
 
 
 def _parse_names(field_value: str) -> List[str]:
@@ -73,7 +180,7 @@ def _parse_names(field_value: str) -> List[str]:
         return []
 
     raw = _strip_braces(field_value.strip())
-    parts = re.split(r"\s+and\s+", raw)
+    parts = _AND_RE.split(raw)
     people: List[str] = []
 
     for p in parts:
@@ -90,8 +197,9 @@ def _parse_names(field_value: str) -> List[str]:
             full_name = last_first[0]
 
         # Collapse internal whitespace and normalize initials
-        full_name = re.sub(r"\s+", " ", full_name)
-        full_name = _normalize_initials(full_name)
+        full_name = " ".join(full_name.split())
+        if "." in full_name:
+            full_name = _normalize_initials(full_name)
         people.append(full_name)
 
     return people
@@ -104,10 +212,38 @@ def get_editors_from_entry(entry: Dict[str, Any]) -> List[str]:
     """Extracts a list of editor full names from a BibTeX entry, normalized."""
     return _parse_names(entry.get('editor', ''))
 
+def _prepared_fields(bib_database: BibDatabase) -> Dict[str, Any]:
+    """Return per-entry match fields, built once and cached on the database.
+
+    Holds the ``_fuzz_key``-processed titles, IDs and sorted, space-joined
+    author names, so repeated lookups never re-parse author fields or
+    re-process the same entry strings, plus ``id_index`` mapping each
+    processed ID to the index of the first entry carrying it and
+    ``matches`` memoizing ``find_bibtex_entry`` results.
+    """
+    prepared = getattr(bib_database, "_prepared", None)
+    if prepared is None or len(prepared["titles"]) != len(bib_database.entries):
+        entries = bib_database.entries
+        prepared = {
+            "titles": [_fuzz_key(str(entry.get('title', ''))) for entry in entries],
+            "ids": [_fuzz_key(str(entry.get('ID', ''))) for entry in entries],
+            "authors": [
+                _fuzz_key(" ".join(sorted(get_authors_from_entry(entry)))) for entry in entries
+            ],
+        }
+        id_index: Dict[str, int] = {}
+        for idx, key in enumerate(prepared["ids"]):
+            if key:
+                id_index.setdefault(key, idx)
+        prepared["id_index"] = id_index
+        prepared["matches"] = {}
+        bib_database._prepared = prepared
+    return prepared
+
 def find_bibtex_entry(
     pdf_title: str,
     pdf_authors: List[str],
-    bib_database: bibtexparser.bibdatabase.BibDatabase,
+    bib_database: BibDatabase,
     title_threshold: int = 80,
     author_threshold: int = 80
 ) -> Optional[Dict[str, Any]]:
@@ -124,29 +260,42 @@ def find_bibtex_entry(
     Returns:
         The best matching BibTeX entry, or None if no good match is found.
     """
+    entries = bib_database.entries
+    prepared = _prepared_fields(bib_database)
+
+    # The database is read-only once loaded, so a repeated query is a lookup
+    cache_key = (pdf_title, tuple(pdf_authors or ()), title_threshold, author_threshold)
+    matches = prepared["matches"]
+    if cache_key in matches:
+        return matches[cache_key]
+
     best_match = None
     best_score = 0
+    # Only titles scoring above the threshold are considered further
+    title_scores = _token_set_scores(pdf_title, prepared["titles"], score_cutoff=title_threshold)
+    pdf_author_str = _fuzz_key(" ".join(sorted(pdf_authors))) if pdf_authors else ""
+
+    # Visit candidates in database order so ties keep the first entry
+    for idx in sorted(title_scores):
+        title_score = title_scores[idx]
+        if title_score <= title_threshold:
+            continue
 
-    for entry in bib_database.entries:
-        bib_title = entry.get('title', '')
-        bib_authors = get_authors_from_entry(entry)
-
-        title_score = fuzz.token_set_ratio(pdf_title, bib_title)
+        entry = entries[idx]
+        bib_author_str = prepared["authors"][idx]
 
-        if title_score > title_threshold:
-            # Compare authors
-            author_score = 0
-            if pdf_authors and bib_authors:
-                pdf_author_str = " ".join(sorted(pdf_authors))
-                bib_author_str = " ".join(sorted(bib_authors))
-                author_score = fuzz.token_set_ratio(pdf_author_str, bib_author_str)
+        # Compare authors
+        author_score = 0
+        if pdf_author_str and bib_author_str:
+            author_score = _token_set_score(pdf_author_str, bib_author_str)
 
-            total_score = title_score + author_score
+        total_score = title_score + author_score
 
-            if total_score > best_score:
-                best_score = total_score
-                best_match = entry
+        if total_score > best_score:
+            best_score = total_score
+            best_match = entry
 
+    matches[cache_key] = best_match
     return best_match
 
 
@@ -158,18 +307,17 @@ def _sanitize_basename(name: str) -> str:
     - Remove file-extension-like suffixes
     - Collapse whitespace
     """
-    import re as _re
     n = name.strip().lower()
     # strip a trailing extension if present
-    n = _re.sub(r"\.[a-z0-9]{1,5}$", "", n)
+    n = _EXT_RE.sub("", n)
     n = n.replace("_", " ").replace("-", " ").replace(".", " ")
-    n = _re.sub(r"\s+", " ", n)
+    n = _WS_RE.sub(" ", n)
     return n
 
 
 def find_bibtex_entry_by_basename(
     base_filename: str,
-    bib_database: bibtexparser.bibdatabase.BibDatabase,
+    bib_database: BibDatabase,
     id_threshold: int = 75,
     title_threshold: int = 80,
 ) -> Optional[Dict[str, Any]]:
@@ -182,24 +330,46 @@ def find_bibtex_entry_by_basename(
     if not target:
         return None
 
+    entries = bib_database.entries
+    prepared = _prepared_fields(bib_database)
+
+    # Exact hit: the file is named after the citation key (a perfect ID
+    # score), so skip fuzzy scoring of the whole database
+    idx = prepared["id_index"].get(_fuzz_key(target))
+    if idx is not None:
+        return entries[idx]
+
+    ids = prepared["ids"]
+    titles = prepared["titles"]
+
+    # Scores are rounded, so anything within 0.5 of a threshold may still pass
+    id_scores = _token_set_scores(target, ids, score_cutoff=id_threshold - 0.5)
+    title_scores = _token_set_scores(target, titles, score_cutoff=title_threshold - 0.5)
+    target = _fuzz_key(target)
+
     best: Optional[Dict[str, Any]] = None
     best_score = 0
-    for entry in bib_database.entries:
-        entry_id = str(entry.get("ID", "")).strip()
-        entry_title = str(entry.get("title", "")).strip()
-
-        id_score = fuzz.token_set_ratio(target, entry_id)
-        title_score = fuzz.token_set_ratio(target, entry_title)
+    for idx in sorted(id_scores.keys() | title_scores.keys()):
+        id_score = id_scores.get(idx)
+        if id_score is None:
+            id_score = _token_set_score(target, ids[idx])
+        title_score = title_scores.get(idx)
+        if title_score is None:
+            title_score = _token_set_score(target, titles[idx])
 
         # Prefer ID matches slightly over title for filenames
         combined = max(int(id_score * 1.05), title_score)
 
         if (id_score >= id_threshold or title_score >= title_threshold) and combined > best_score:
-            best = entry
+            best = entries[idx]
             best_score = combined
 
     return best
 
+def _title_sep(match: "re.Match[str]") -> str:
+    """Replacement for ``_TITLE_SEP_RE``: separators become an en dash."""
+    return " – " if match.group().strip() else " "
+
 def normalize_meta(entry: Dict[str, Any]) -> Dict[str, Any]:
     """
     Extracts and normalizes metadata from a BibTeX entry.
@@ -222,21 +392,19 @@ def normalize_meta(entry: Dict[str, Any]) -> Dict[str, Any]:
         A dictionary with normalized metadata.
     """
     raw_title = entry.get('title', '').strip()
-    # Normalize separators to an en dash surrounded by spaces
-    title = raw_title.replace(':', ' – ')
-    title = re.sub(r"\s+[-–—]\s+", " – ", title)
-    # Collapse multiple whitespace into single space
-    title = re.sub(r'\s+', ' ', title)
+    # Normalize separators to an en dash surrounded by spaces and collapse
+    # other whitespace runs, in a single regex pass
+    title = _TITLE_SEP_RE.sub(_title_sep, raw_title.replace(':', ' – '))
     # Strip trailing punctuation (e.g., periods, commas, colons, semicolons)
     title = title.rstrip('.,:; ')
 
     # Derive short_title by splitting on colon or dash and taking first segment
-    short_title_split = re.split(r'[:–-]', raw_title)
+    short_title_split = _SHORT_TITLE_SPLIT_RE.split(raw_title)
     short_title = short_title_split[0].strip() if short_title_split else title
 
     # Extract year (BibTeX: 'year'; BibLaTeX: often 'date' like YYYY or YYYY-MM-DD)
     year = entry.get('year', '') or entry.get('date', '')
-    match_year = re.search(r'\b(\d{4})\b', year)
+    match_year = _YEAR_RE.search(year)
     year_clean = match_year.group(1) if match_year else year
 
     entry_type = entry.get('ENTRYTYPE', '').lower()
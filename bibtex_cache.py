@@ -0,0 +1,151 @@
+"""
+Persists parsed BibTeX databases between runs as pickles, so a large .bib
+file is only parsed again after it changes.
+"""
+import glob
+import hashlib
+import os
+import pickle
+import re
+import tempfile
+import threading
+import time
+from functools import lru_cache
+from typing import Optional
+
+import bibtexparser
+
+from bib import BibDatabase, load_bibtex, _prepared_fields, _BIBTEXPARSER_V2, _PARSE_FORMAT_VERSION
+
+# Bump when the pickled layout changes so old cache files are ignored
+_CACHE_VERSION = 1
+
+# Which parser (and bib.py parse format) built a pickle. v1 and v2 decode
+# and keep entries differently, so switching parsers must not reuse a cache
+_PARSER_TAG = "bp{}-{}-f{}".format(
+    2 if _BIBTEXPARSER_V2 else 1,
+    re.sub(r"[^0-9A-Za-z.]", "", getattr(bibtexparser, "__version__", "")),
+    _PARSE_FORMAT_VERSION,
+)
+
+# Temp files younger than this may belong to a concurrent writer
+_STALE_TMP_SEC = 60
+
+
+def _cache_dir() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "pdf-highlight-extraction")
+
+
+def _cache_prefix(bibtex_path: str) -> str:
+    """Cache-file prefix shared by every version of one .bib file."""
+    digest = hashlib.sha1(bibtex_path.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(_cache_dir(), f"bib_v{_CACHE_VERSION}_{digest}_")
+
+
+def load_bibtex_cached(bibtex_path: str) -> BibDatabase:
+    """
+    Loads a BibTeX/BibLaTeX file, reusing a pickled parse when unchanged.
+
+    The cache is keyed on the file's absolute path, mtime and size, so
+    editing the .bib invalidates it automatically, and on the bibtexparser
+    version and bib.py parse format that built it. Entries and the
+    prepared match fields are stored as plain lists and dicts, which
+    unpickle far faster than re-parsing. Any cache read or write problem
+    falls back to a normal ``load_bibtex``.
+
+    Args:
+        bibtex_path: The path to the BibTeX/BibLaTeX file.
+
+    Returns:
+        A BibDatabase object; treat it as read-only.
+    """
+    path = os.path.abspath(bibtex_path)
+    st = os.stat(path)
+    return _load_cached(path, st.st_mtime_ns, st.st_size)
+
+
+@lru_cache(maxsize=4)
+def _load_cached(bibtex_path: str, mtime_ns: int, size: int) -> BibDatabase:
+    prefix = _cache_prefix(bibtex_path)
+    cache_path = f"{prefix}{_PARSER_TAG}_{mtime_ns}_{size}.pkl"
+
+    try:
+        with open(cache_path, "rb") as f:
+            entries, prepared = pickle.load(f)
+    except Exception:
+        # Missing, truncated or incompatible cache file; parse below
+        pass
+    else:
+        bib_database = BibDatabase()
+        bib_database.entries = entries
+        # Match results are per-process memos, never persisted
+        bib_database._prepared = dict(prepared, matches={})
+        return bib_database
+
+    bib_database = load_bibtex(bibtex_path)
+    prepared = {k: v for k, v in _prepared_fields(bib_database).items() if k != "matches"}
+
+    tmp_path = None
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        # Write to a temp file and rename, so concurrent runs never see a
+        # partial pickle
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(cache_path), prefix=os.path.basename(prefix), suffix=".tmp"
+        )
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump((bib_database.entries, prepared), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+        tmp_path = None
+        # Drop caches for older versions of the same .bib file (or another
+        # parser), and temp files left by writes that were interrupted
+        now = time.time()
+        for stale in glob.glob(glob.escape(prefix) + "*.pkl"):
+            if stale != cache_path:
+                os.remove(stale)
+        for stale in glob.glob(glob.escape(prefix) + "*.tmp"):
+            if now - os.path.getmtime(stale) > _STALE_TMP_SEC:
+                os.remove(stale)
+    except (OSError, pickle.PicklingError):
+        # The cache is an optimization only; never fail the load over it
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    return bib_database
+
+
+class BackgroundBibtexLoad:
+    """A ``load_bibtex_cached`` call running on a daemon thread.
+
+    A daemon thread rather than an executor, so a process whose PDFs have
+    no highlights exits without waiting for a parse it never uses (an
+    interrupted cache write only leaves a temp file, removed by a later
+    write).
+    """
+
+    def __init__(self, bibtex_path: str):
+        self._done = threading.Event()
+        self._result: Optional[BibDatabase] = None
+        self._error: Optional[BaseException] = None
+        threading.Thread(
+            target=self._run, args=(bibtex_path,), name="bibtex-load", daemon=True
+        ).start()
+
+    def _run(self, bibtex_path: str) -> None:
+        try:
+            self._result = load_bibtex_cached(bibtex_path)
+        except BaseException as e:
+            self._error = e
+        finally:
+            self._done.set()
+
+    def result(self) -> BibDatabase:
+        """Wait for the load and return it, re-raising its error if it failed."""
+        self._done.wait()
+        if self._error is not None:
+            raise self._error
+        return self._result
@@ -3,52 +3,117 @@ Handles the export of enriched annotations to a Readwise-ready CSV file.
 """
 import csv
 import json
-from typing import List, Dict, Any
+from itertools import chain
+from typing import List, Dict, Any, Iterator, Optional, Tuple, BinaryIO
 
-def create_readwise_csv(
-    json_path: str,
-    output_path: str,
-):
+# Stream annotations with ijson when available (falls back to json.load)
+try:
+    import ijson  # type: ignore
+except ImportError:
+    ijson = None
+
+# Without ijson, decode the whole file with orjson when available
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+
+
+def _read_enriched(f: BinaryIO) -> Tuple[Dict[str, Any], Iterator[Dict[str, Any]]]:
+    """Read the ``meta`` block and return an iterator over ``data`` items.
+
+    With ijson the annotations are yielded one at a time while the file is
+    read, so the full array is never held in memory.
+    """
+    if ijson is None:
+        enriched_data = orjson.loads(f.read()) if orjson is not None else json.load(f)
+        return enriched_data.get("meta", {}) or {}, iter(enriched_data.get("data", []) or [])
+
+    meta = next(ijson.items(f, "meta"), None) or {}
+    f.seek(0)
+    return meta, ijson.items(f, "data.item")
+
+
+def create_readwise_csv(json_path: str, output_path: str) -> bool:
     """
     Creates a Readwise-ready CSV file from an enriched JSON file.
 
     Args:
         json_path: Path to the enriched JSON file.
         output_path: Path to write the output CSV file.
+
+    Returns:
+        True if the file was written, False if there were no annotations.
     """
-    with open(json_path, 'r', encoding='utf-8') as f:
-        enriched_data = json.load(f)
+    with open(json_path, 'rb') as f:
+        meta, annotations = _read_enriched(f)
+        # Rows are written while ijson is still reading the file
+        return _write_readwise_csv(json_path, output_path, meta, annotations)
 
-    meta = enriched_data.get("meta", {})
-    annotations = enriched_data.get("data", [])
 
-    if not annotations:
-        print(f"No annotations found in {json_path}. Skipping CSV export.")
-        return
+def create_readwise_csv_from_data(
+    enriched_data: Dict[str, Any],
+    output_path: str,
+    source: Optional[str] = None,
+) -> bool:
+    """
+    Creates a Readwise-ready CSV file from already-loaded enriched data.
+
+    Args:
+        enriched_data: Enriched JSON content ({"meta", "data"}).
+        output_path: Path to write the output CSV file.
+        source: Where the data came from, used in log messages.
+
+    Returns:
+        True if the file was written, False if there were no annotations.
+    """
+    meta = enriched_data.get("meta", {}) or {}
+    annotations = iter(enriched_data.get("data", []) or [])
+    return _write_readwise_csv(source or "enriched data", output_path, meta, annotations)
+
+
+def _write_readwise_csv(
+    source: str,
+    output_path: str,
+    meta: Dict[str, Any],
+    annotations: Iterator[Dict[str, Any]],
+) -> bool:
+    """Write the Readwise CSV rows for ``meta`` and the ``annotations`` iterator."""
+    first = next(annotations, None)
+    if first is None:
+        print(f"No annotations found in {source}. Skipping CSV export.")
+        return False
 
     # Readwise required headers
     headers = ["Title", "Author", "Category", "Source URL", "Highlight", "Note", "Location"]
 
+    # Per-file columns are the same for every row
+    title = meta.get("title", "")
+    author = ", ".join(meta.get("authors", []))
+    category = "articles"  # Defaulting to articles
+    # Prioritize DOI for Source URL, then fallback to URL
+    source_url = ""
+    if meta.get("doi"):
+        source_url = f'https://doi.org/{meta.get("doi")}'
+    elif meta.get("url"):
+        source_url = meta.get("url")
+
+    count = 0
     with open(output_path, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=headers)
-        writer.writeheader()
-
-        for annot in annotations:
-            # Prioritize DOI for Source URL, then fallback to URL
-            source_url = ""
-            if meta.get("doi"):
-                source_url = f'https://doi.org/{meta.get("doi")}'
-            elif meta.get("url"):
-                source_url = meta.get("url")
-
-            writer.writerow({
-                "Title": meta.get("title", ""),
-                "Author": ", ".join(meta.get("authors", [])),
-                "Category": "articles",  # Defaulting to articles
-                "Source URL": source_url,
-                "Highlight": annot.get("text", ""),
-                "Note": annot.get("note", ""),
-                "Location": f'Page {annot.get("page_number")}',
-            })
-
-    print(f"Successfully exported {len(annotations)} highlights to {output_path}")
+        writer = csv.writer(csvfile)
+        writer.writerow(headers)
+
+        for annot in chain([first], annotations):
+            writer.writerow((
+                title,
+                author,
+                category,
+                source_url,
+                annot.get("text", ""),
+                annot.get("note", ""),
+                f'Page {annot.get("page_number")}',
+            ))
+            count += 1
+
+    print(f"Successfully exported {count} highlights to {output_path}")
+    return True
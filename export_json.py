@@ -4,44 +4,105 @@ Orchestrates the extraction, enrichment, and export of annotations to an enriche
 import json
 import os
 import re
-import fitz
-import html
-from typing import List, Dict, Any
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 
 from annotations import extract_annotations, Annotation
+from bibtex_cache import BackgroundBibtexLoad, load_bibtex_cached
 from bib import (
-    load_bibtex,
     find_bibtex_entry,
     normalize_meta,
     find_bibtex_entry_by_basename,
 )
 
+# Prefer orjson (much faster encoding) when available; stdlib json otherwise
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+
+# Annotations serialized per write when streaming the "data" array
+_WRITE_BATCH = 100
+
+# Common separators in PDF author metadata: commas, semicolons, or the word 'and'
+_AUTHOR_SPLIT_RE = re.compile(r"\s*(?:,|;|\band\b)\s*")
+
+
+def _dumps(obj: Any) -> bytes:
+    """Serialize with 2-space indent (the only indent orjson supports).
+
+    Both encoders produce identical bytes and keep Unicode characters as-is
+    (no \\uXXXX escapes).
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+def _nest(encoded: bytes, depth: int) -> bytes:
+    """Re-indent an encoded value so it can be embedded ``depth`` levels deep.
+
+    JSON escapes newlines inside strings, so every raw newline is structural.
+    """
+    return encoded.replace(b"\n", b"\n" + b"  " * depth)
+
+
+def _iter_json_chunks(meta: Dict[str, Any], annotations: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """Yield the enriched JSON document piece by piece.
+
+    Produces the same bytes as encoding ``{"meta": ..., "data": [...]}`` in
+    one go, but only ever holds one batch of encoded annotations.
+    """
+    yield b'{\n  "meta": ' + _nest(_dumps(meta), 1) + b',\n  "data": ['
+    sep = b"\n    "
+    wrote_any = False
+    batch: List[bytes] = []
+    for annot in annotations:
+        batch.append(_nest(_dumps(annot), 2))
+        if len(batch) >= _WRITE_BATCH:
+            yield sep + b",\n    ".join(batch)
+            sep = b",\n    "
+            wrote_any = True
+            batch = []
+    if batch:
+        yield sep + b",\n    ".join(batch)
+        wrote_any = True
+    yield b"\n  ]\n}" if wrote_any else b"]\n}"
+
 def create_enriched_json(
     pdf_path: str,
     bib_path: str,
-    output_path: str,
-):
+    output_path: Optional[str],
+    bib_loader: Optional[BackgroundBibtexLoad] = None,
+) -> Optional[Dict[str, Any]]:
     """
     Creates an enriched JSON file containing PDF annotations and BibTeX metadata.
 
     Args:
         pdf_path: Path to the PDF file.
         bib_path: Path to the BibTeX file.
-        output_path: Path to write the output JSON file.
+        output_path: Path to write the output JSON file, or None to only
+            build the enriched data in memory.
+        bib_loader: A ``load_bibtex_cached(bib_path)`` already running in the
+            background; its result is only awaited once the annotations are
+            extracted. When None, the file is loaded here.
+
+    Returns:
+        The enriched data ({"meta": ..., "data": [...]}), so
+        downstream exports can reuse it without re-reading the file, or
+        None when the PDF has no highlights.
     """
-    # 1. Extract raw annotations
-    annotations = extract_annotations(pdf_path)
+    # 1. Extract raw annotations, reading document metadata from the same open
+    result = extract_annotations(pdf_path, return_metadata=True)
+    annotations = result.annotations
 
     if not annotations:
         print(f"No highlights found in {pdf_path}. Skipping.")
-        return
+        return None
 
     # 2. Enrich with BibTeX metadata
-    bib_database = load_bibtex(bib_path)
+    bib_database = bib_loader.result() if bib_loader is not None else load_bibtex_cached(bib_path)
 
-    doc = fitz.open(pdf_path)
-    pdf_metadata = doc.metadata
-    doc.close()
+    pdf_metadata = result.metadata
 
     base_filename = os.path.splitext(os.path.basename(pdf_path))[0]
     # Prefer embedded PDF title, but fall back if missing/blank
@@ -49,11 +110,13 @@ def create_enriched_json(
     
     # Normalize author names from PDF metadata for better matching
     pdf_author_str = pdf_metadata.get('author', '') or ''
-    # Split on common separators: commas, semicolons, or the word 'and'
-    pdf_author_list = [
-        a.strip() for a in re.split(r"\s*(?:,|;|\band\b)\s*", pdf_author_str)
-        if a.strip()
-    ]
+    # Split on common separators: commas, semicolons, or the word 'and'.
+    # Without ';' or "and" only commas can split, so skip the regex engine.
+    if ";" not in pdf_author_str and "and" not in pdf_author_str:
+        pieces = pdf_author_str.split(",")
+    else:
+        pieces = _AUTHOR_SPLIT_RE.split(pdf_author_str)
+    pdf_author_list = [a.strip() for a in pieces if a.strip()]
 
     # Prefer filename-based lookup first (reference manager schema Title_Authors_Year)
     bib_entry = find_bibtex_entry_by_basename(base_filename, bib_database)
@@ -81,39 +144,26 @@ def create_enriched_json(
         # Emit a warning so the UI can surface an issue in the summary
         print(f"Warning: No BibTeX match found for '{base_filename}'. Metadata may be incomplete.")
 
-    # 3b. Sanitize annotation text and notes for consistent JSON/MD export
-    def _sanitize_text(s: str) -> str:
-        if s is None:
-            return ""
-        # HTML entities → characters (e.g., &amp; → &)
-        s = html.unescape(str(s))
-        # Normalize newlines and remove carriage returns
-        s = s.replace("\r\n", "\n").replace("\r", "\n")
-        # Normalize spaces
-        s = s.replace("\xa0", " ")  # non-breaking space
-        s = s.replace("\u200b", "")  # zero-width space
-        s = s.replace("\ufeff", "")  # BOM
-        s = s.replace("\u00ad", "")  # soft hyphen
-        # Trim each line and collapse intra-line runs of spaces/tabs, then join with a single space
-        lines = [re.sub(r"[\t ]+", " ", ln.strip()) for ln in s.split("\n")]
-        s = " ".join([ln for ln in lines if ln])
-        return s.strip()
-
-    cleaned_annots = []
-    for a in annotations:
-        d = a.dict()
-        d["text"] = _sanitize_text(d.get("text", ""))
-        d["note"] = _sanitize_text(d.get("note", ""))
-        cleaned_annots.append(d)
-
-    enriched_data = {
-        "meta": meta,
-        "data": cleaned_annots,
-    }
-
-    # 4. Export to JSON
-    with open(output_path, 'w', encoding='utf-8') as f:
-        # Keep Unicode characters as-is for readability (no \uXXXX escapes)
-        json.dump(enriched_data, f, indent=4, ensure_ascii=False)
-
-    print(f"Successfully exported enriched JSON to {output_path}")
+    # 3b. Text and notes were sanitized at extraction time (see
+    # annotations.sanitize_text), so the data is ready for every export
+    def _cleaned(a: Annotation) -> Dict[str, Any]:
+        # Annotation's fields are flat scalars, so build the dict directly
+        # (same key order) rather than via asdict's recursive deep copy
+        return {
+            "text": a.text,
+            "page_number": a.page_number,
+            "color": a.color,
+            "note": a.note,
+        }
+
+    data = [_cleaned(a) for a in annotations]
+
+    # 4. Export to JSON, encoding annotations in batches so the serialized
+    # document is never built in memory as one string
+    if output_path is not None:
+        with open(output_path, 'wb') as f:
+            for chunk in _iter_json_chunks(meta, data):
+                f.write(chunk)
+
+        print(f"Successfully exported enriched JSON to {output_path}")
+    return {"meta": meta, "data": data}
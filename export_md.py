@@ -3,146 +3,205 @@ Handles the export of enriched annotations to a Markdown file.
 """
 import json
 import re
-
-
-def create_markdown_export(
-    json_path: str,
-    output_path: str,
-):
+import yaml
+from typing import Any, Dict, Optional
+
+# libyaml-backed dumper when PyYAML was built with it; pure-Python otherwise
+try:
+    from yaml import CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeDumper  # type: ignore
+
+# Prefer orjson (much faster decoding) when available; stdlib json otherwise
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+
+# Whitespace runs collapsed when comparing notes to highlight text
+_WHITESPACE_RE = re.compile(r"\s+")
+# Dash or colon separating a short title from its subtitle
+_ALIAS_SPLIT_RE = re.compile(r"\s*[–—\-:]\s*")
+# Simple color to tag mapping (can be expanded in config)
+COLOR_TAG_MAP = {
+    '#b9e8b9': '#important-pdf',
+    '#c3e1f8': '#reference-note-pdf',
+    '#f0bbcd': '#secondary-pdf',
+    '#f9e196': '#general-pdf',
+}
+
+# One bullet per highlight; tag line and memo block are pre-rendered or ""
+_HIGHLIGHT_TEMPLATE = "- {text}\n> page: `{page}`\n{tag_line}{memo_block}\n"
+
+
+def create_markdown_export(json_path: str, output_path: str) -> bool:
     """
     Creates a Markdown file from an enriched JSON file.
 
     Args:
         json_path: Path to the enriched JSON file.
         output_path: Path to write the output Markdown file.
+
+    Returns:
+        True if the file was written, False if there were no annotations.
     """
-    with open(json_path, 'r', encoding='utf-8') as f:
-        enriched_data = json.load(f)
+    with open(json_path, 'rb') as f:
+        raw = f.read()
+    enriched_data = orjson.loads(raw) if orjson is not None else json.loads(raw)
 
+    return create_markdown_export_from_data(enriched_data, output_path, source=json_path)
+
+
+def create_markdown_export_from_data(
+    enriched_data: Dict[str, Any],
+    output_path: str,
+    source: Optional[str] = None,
+) -> bool:
+    """
+    Creates a Markdown file from already-loaded enriched data.
+
+    Args:
+        enriched_data: Enriched JSON content ({"meta", "data"}).
+        output_path: Path to write the output Markdown file.
+        source: Where the data came from, used in log messages.
+
+    Returns:
+        True if the file was written, False if there were no annotations.
+    """
     meta = enriched_data.get("meta", {}) or {}
     annotations = enriched_data.get("data", []) or []
 
     if not annotations:
-        print(f"No annotations found in {json_path}. Skipping Markdown export.")
-        return
+        print(f"No annotations found in {source or 'enriched data'}. Skipping Markdown export.")
+        return False
+
+    # Read each metadata field once
+    title = meta.get('title') or ''
+    short_title = meta.get('short_title') or ''
+    year = meta.get('year') or ''
+    authors = meta.get('authors') or []
+    editors = meta.get('editors') or []
+    citation_key = meta.get('citation_key') or ''
+    entry_type = str(meta.get('entry_type') or '').lower()
+
+    # Assemble the whole document in memory and write it in one call
+    parts: list[str] = []
+    out = parts.append
+
+    # Build the YAML front matter as a dict; the dumper handles all quoting
+    # and escaping (quotes, colons, leading '#' or '[' in values)
+    front_matter: Dict[str, Any] = {}
+    front_matter["title"] = title
+    # A bare year stays an integer, as the hand-written `year: 1999` was
+    front_matter["year"] = int(year) if str(year).isdigit() else (year or None)
+
+    # Authors
+    for i, author in enumerate(authors, start=1):
+        front_matter[f"author-{i}"] = f"[[{author}]]"
+
+    # Editors
+    for i, editor in enumerate(editors, start=1):
+        front_matter[f"editor-{i}"] = f"[[{editor}]]"
+
+    # Citation key
+    if citation_key:
+        front_matter["citation-key"] = f"[[@{citation_key}]]"
+
+    # Highlights count
+    front_matter["highlights"] = len(annotations)
+
+    # Type
+    if entry_type:
+        front_matter["type"] = f"#{entry_type}-pdf"
+
+    # Aliases (full title + optional short title). Avoid duplicates.
+    aliases: list[str] = []
+    if title:
+        aliases.append(title)
+
+    # Derive a short title if not provided: take text before a dash/colon
+    if not short_title and title:
+        title_parts = _ALIAS_SPLIT_RE.split(title, maxsplit=1)
+        if len(title_parts) > 1 and title_parts[0].strip():
+            short_title = title_parts[0].strip()
+
+    if short_title:
+        aliases.append(short_title)
+
+    # Deduplicate while preserving order
+    seen = set()
+    unique_aliases = []
+    for a in aliases:
+        key = a.strip()
+        if key and key not in seen:
+            seen.add(key)
+            unique_aliases.append(a)
+
+    if unique_aliases:
+        front_matter["aliases"] = unique_aliases
+
+    out("---\n")
+    out(yaml.dump(
+        front_matter,
+        Dumper=SafeDumper,
+        default_flow_style=False,
+        allow_unicode=True,
+        sort_keys=False,
+        width=2**31 - 1,  # never fold long titles onto continuation lines
+    ))
+    out("---\n\n")
+
+    # Add H1 header with citation key after YAML front matter
+    if citation_key:
+        out(f"# Highlights for [[@{citation_key}]]\n\n")
+    else:
+        out("# Highlights\n\n")
+
+    # Helper: check whether an annotation note is meaningful (not just a copy of the text)
+    def _normalize_for_compare(s: str) -> str:
+        # Compare notes to text verbatim aside from whitespace differences
+        s = (s or "")
+        s = s.replace("\r\n", "\n").replace("\r", "\n")
+        s = s.replace("\n", " ")
+        s = _WHITESPACE_RE.sub(" ", s)
+        return s.strip()
+
+    def _is_meaningful_note(note: str, text: str) -> bool:
+        if not note or not note.strip():
+            return False
+        nn = _normalize_for_compare(note)
+        nt = _normalize_for_compare(text)
+        if not nn:
+            return False
+        # Skip only if verbatim (modulo whitespace) duplicate of the text
+        if nn == nt:
+            return False
+        return True
+
+    # Write annotations
+    for annot in annotations:
+        text = annot.get('text', '') or ''
+        page_number = annot.get('page_number')
+
+        # Missing colors (None) simply miss the map
+        tag = COLOR_TAG_MAP.get(annot.get('color'), '')
+        tag_line = f"> tags: {tag}\n" if tag else ""
+
+        note = annot.get('note')
+        memo_block = ""
+        if _is_meaningful_note(note, text):
+            _note_text = note.replace("\r\n", "\n").replace("\r", "\n").strip()
+            memo_block = "\n>[!memo]\n" + "".join(f"> {line}\n" for line in _note_text.split('\n'))
+
+        out(_HIGHLIGHT_TEMPLATE.format_map({
+            "text": text,
+            "page": page_number,
+            "tag_line": tag_line,
+            "memo_block": memo_block,
+        }))
 
     with open(output_path, 'w', encoding='utf-8') as md_file:
-    # Write YAML front matter
-        md_file.write("---\n")
-        _title = meta.get('title', '')
-        md_file.write(f'title: "{_title}"\n')
-        md_file.write(f"year: {meta.get('year', '')}\n")
-
-        # Authors
-        for i, author in enumerate(meta.get('authors', []), start=1):
-            md_file.write(f'author-{i}: "[[{author}]]"\n')
-
-        # Editors
-        for i, editor in enumerate(meta.get('editors', []), start=1):
-            md_file.write(f'editor-{i}: "[[{editor}]]"\n')
-
-        # Citation key
-        citation_key = meta.get('citation_key', '')
-        if citation_key:
-            md_file.write(f'citation-key: "[[@{citation_key}]]"\n')
-
-        # Highlights count
-        md_file.write(f"highlights: {len(annotations)}\n")
-
-        # Type (quote the value to avoid YAML treating it as a comment)
-        entry_type = str(meta.get('entry_type', '') or '').lower()
-        if entry_type:
-            md_file.write(f'type: "#{entry_type}-pdf"\n')
-
-        # Aliases (full title + optional short title). Avoid duplicates.
-        full_title = meta.get('title', '') or ''
-        short_title = meta.get('short_title', '') or ''
-
-        aliases: list[str] = []
-        if full_title:
-            aliases.append(full_title)
-
-        # Derive a short title if not provided: take text before a dash/colon
-        if not short_title and full_title:
-            parts = re.split(r"\s*[–—-:]\s*", full_title, maxsplit=1)
-            if len(parts) > 1 and parts[0].strip():
-                short_title = parts[0].strip()
-
-        if short_title:
-            aliases.append(short_title)
-
-        # Deduplicate while preserving order
-        seen = set()
-        unique_aliases = []
-        for a in aliases:
-            key = a.strip()
-            if key and key not in seen:
-                seen.add(key)
-                unique_aliases.append(a)
-
-        if unique_aliases:
-            md_file.write("aliases:\n")
-            for a in unique_aliases:
-                md_file.write(f'  - "{a}"\n')
-
-        md_file.write("---\n\n")
-
-        # Add H1 header with citation key after YAML front matter
-        if citation_key:
-            md_file.write(f"# Highlights for [[@{citation_key}]]\n\n")
-        else:
-            md_file.write("# Highlights\n\n")
-
-        # Simple color to tag mapping (can be expanded in config)
-        color_map = {
-            '#b9e8b9': '#important-pdf',
-            '#c3e1f8': '#reference-note-pdf',
-            '#f0bbcd': '#secondary-pdf',
-            '#f9e196': '#general-pdf',
-        }
-
-        # Helper: check whether an annotation note is meaningful (not just a copy of the text)
-        def _normalize_for_compare(s: str) -> str:
-            # Compare notes to text verbatim aside from whitespace differences
-            s = (s or "")
-            s = s.replace("\r\n", "\n").replace("\r", "\n")
-            s = s.replace("\n", " ")
-            s = re.sub(r"\s+", " ", s)
-            return s.strip()
-
-        def _is_meaningful_note(note: str, text: str) -> bool:
-            if not note or not note.strip():
-                return False
-            nn = _normalize_for_compare(note)
-            nt = _normalize_for_compare(text)
-            if not nn:
-                return False
-            # Skip only if verbatim (modulo whitespace) duplicate of the text
-            if nn == nt:
-                return False
-            return True
-
-        # Write annotations
-        for annot in annotations:
-            text = annot.get('text', '') or ''
-            page_number = annot.get('page_number')
-
-            md_file.write(f"- {text}\n")
-            md_file.write(f"> page: `{page_number}`\n")
-
-            color = annot.get('color')
-            tag = color_map.get(color, '') if color else ''
-            if tag:
-                md_file.write(f"> tags: {tag}\n")
-
-            note = annot.get('note')
-            if _is_meaningful_note(note, text):
-                md_file.write("\n")
-                md_file.write(">[!memo]\n")
-                _note_text = note.replace("\r\n", "\n").replace("\r", "\n").strip()
-                for line in _note_text.split('\n'):
-                    md_file.write(f"> {line}\n")
-
-            md_file.write("\n")
+        md_file.write("".join(parts))
 
     print(f"Successfully exported {len(annotations)} highlights to {output_path}")
+    return True
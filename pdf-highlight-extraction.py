@@ -3,149 +3,293 @@ Main entry point for the PDF highlight extraction and export pipeline.
 """
 import argparse
 import os
-import yaml
-import json
 import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 
-from export_json import create_enriched_json
-from export_csv import create_readwise_csv
-from export_md import create_markdown_export
 from ui_notifications import show_final_dialog
 
+# config.yaml and the relative paths it names live next to this script
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+# The pipeline modules (PyMuPDF, BibTeX parsing, exporters) are imported
+# where they are first used, so disabled exports and early argument errors
+# never pay their import cost
+
+
+def _load_config(config_path: Path) -> Dict[str, Any]:
+    """Parse config.yaml with libyaml's loader when PyYAML was built with it."""
+    import yaml
+
+    try:
+        from yaml import CSafeLoader as SafeLoader
+    except ImportError:
+        from yaml import SafeLoader  # type: ignore
+
+    with open(config_path, 'r') as f:
+        return yaml.load(f, Loader=SafeLoader)
+
+
+def process_pdf(
+    pdf_path: str,
+    bibtex_path: Path,
+    json_output_dir: Path,
+    csv_output_dir: Path,
+    md_output_dir: Path,
+    no_csv: bool = False,
+    no_md: bool = False,
+    no_json: bool = False,
+    bib_loader=None,
+) -> Dict[str, Any]:
+    """
+    Runs the JSON, CSV and Markdown exports for a single PDF.
+
+    Module-level (rather than a closure) so it can be pickled into a
+    ProcessPoolExecutor worker. Output directories must already exist.
+    ``bib_loader`` is an in-process background BibTeX load (see
+    ``create_enriched_json``); it cannot be sent to a worker process.
+    With ``no_json`` the enriched data is only kept in memory for the
+    CSV/Markdown exports.
+
+    Returns:
+        A dict with the display name, highlight count and per-format status
+        ("success", "warning", "failed", or None when skipped).
+    """
+    from export_json import create_enriched_json
+
+    # --- File Naming ---
+    base_filename = Path(pdf_path).stem
+    json_path = None if no_json else json_output_dir / f"{base_filename}.json"
+
+    # --- Run Pipeline ---
+    # 1. Create enriched JSON (source of truth)
+    json_status = None
+    csv_status = None
+    md_status = None
+    highlight_count = 0
+    output_display_name = base_filename
+
+    try:
+        enriched_data = create_enriched_json(pdf_path, bibtex_path, json_path, bib_loader=bib_loader)
+    except Exception as e:
+        # Report the failure instead of aborting the rest of a batch
+        print(f"Error: Failed to process '{pdf_path}': {e}")
+        enriched_data = None
+
+    # 2. Create other exports from the enriched data already in memory
+    # (None means nothing was written: no highlights, or extraction failed)
+    if enriched_data:
+        annotations = enriched_data.get("data", [])
+        highlight_count = len(annotations)
+        meta = enriched_data.get("meta", {})
+        citation_key, title, year, entry_type = (
+            meta.get(k, "") for k in ("citation_key", "title", "year", "entry_type")
+        )
+        entry_type = entry_type.lower()
+
+        # Construct new base_filename based on naming convention
+        if citation_key and entry_type:
+            output_display_name = f"{citation_key} {entry_type}-pdf"
+        else:
+            output_display_name = base_filename
+
+        # JSON status: warn if BibTeX metadata wasn't found/complete; an
+        # unwritten JSON with complete metadata counts as skipped
+        meta_complete = bool(citation_key and title and year)
+        if not meta_complete:
+            json_status = "warning"
+        elif not no_json:
+            json_status = "success"
+
+        # Create exports if not disabled
+        exports = {}
+        if not no_csv:
+            from export_csv import create_readwise_csv_from_data
+            exports["csv"] = (create_readwise_csv_from_data, csv_output_dir / f"{output_display_name}.csv")
+        if not no_md:
+            from export_md import create_markdown_export_from_data
+            exports["md"] = (create_markdown_export_from_data, md_output_dir / f"{output_display_name}.md")
+
+        if exports and highlight_count > 0:
+            statuses = {
+                fmt: _run_export(export, enriched_data, out_path)
+                for fmt, (export, out_path) in exports.items()
+            }
+        else:
+            # The exporters skip when there are no annotations
+            statuses = {fmt: "warning" for fmt in exports}
+        csv_status = statuses.get("csv")
+        md_status = statuses.get("md")
+    else:
+        json_status = "failed"
+
+    return {
+        "file_name": output_display_name,
+        "highlight_count": highlight_count,
+        "json_status": json_status,
+        "csv_status": csv_status,
+        "md_status": md_status,
+    }
+
+
+def _run_export(export, enriched_data: Dict[str, Any], out_path: Path) -> str:
+    """Run one CSV/Markdown exporter and return its status."""
+    try:
+        # Exporters return False when they skip writing the file
+        written = export(enriched_data, out_path)
+    except Exception:
+        return "failed"
+    return "success" if written else "failed"
+
+
+def _classify(result: Dict[str, Any]) -> Tuple[int, int, int]:
+    """Return (success, issue, fail) counts for one file's result."""
+    return _classify_statuses(
+        result["json_status"],
+        result["csv_status"],
+        result["md_status"],
+        result["highlight_count"] == 0,
+    )
+
+
+@lru_cache(maxsize=64)
+def _classify_statuses(
+    json_status: Optional[str],
+    csv_status: Optional[str],
+    md_status: Optional[str],
+    empty: bool,
+) -> Tuple[int, int, int]:
+    """Cached (success, issue, fail) for one outcome; a batch has only a few."""
+    success = 1 if (json_status in (None, "success")) and (csv_status in (None, "success", "warning")) and (md_status in (None, "success", "warning")) else 0
+    fail = 1 if json_status == "failed" or csv_status == "failed" or md_status == "failed" else 0
+    issue = 1 if not fail and (
+        json_status == "warning" or csv_status == "warning" or md_status == "warning" or empty
+    ) else 0
+    return success, issue, fail
+
+
+def _collect_pdf_paths(paths: List[str]) -> List[str]:
+    """Expand directories to the PDFs they contain; validate every path."""
+    pdf_paths: List[str] = []
+    for path in paths:
+        if not os.path.isabs(path):
+            print(f"Error: Please provide an absolute path for '{path}'.")
+            continue
+        if os.path.isdir(path):
+            pdf_paths.extend(
+                os.path.join(path, name)
+                for name in sorted(os.listdir(path))
+                if name.lower().endswith(".pdf")
+            )
+        elif os.path.exists(path):
+            pdf_paths.append(path)
+        else:
+            print(f"Error: The file '{path}' was not found.")
+    return pdf_paths
+
+
 def main():
     """Main function to run the pipeline."""
     start_time = time.time()
 
     # --- Argument Parsing ---
     parser = argparse.ArgumentParser(description="Extract PDF highlights and export to various formats.")
-    parser.add_argument("pdf_path", help="The absolute path to the PDF file to process.")
+    parser.add_argument("pdf_paths", nargs="+", help="Absolute paths to the PDF files (or directories of PDFs) to process.")
     parser.add_argument("--output-dir", help="Directory to save output files. Overrides config.yaml.")
     parser.add_argument("--no-csv", action="store_true", help="Disable CSV export.")
     parser.add_argument("--no-md", action="store_true", help="Disable Markdown export.")
+    parser.add_argument("--no-json", action="store_true", help="Don't write the enriched JSON file; CSV/Markdown are built from memory.")
+    parser.add_argument("--workers", type=int, default=None, help="Number of PDFs to process in parallel (default: CPU count).")
     args = parser.parse_args()
 
-    # --- Configuration ---
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    
-    if not os.path.isabs(args.pdf_path):
-        print("Error: Please provide an absolute path for the PDF file.")
-        return
-
-    if not os.path.exists(args.pdf_path):
-        print(f"Error: The file '{args.pdf_path}' was not found.")
+    pdf_paths = _collect_pdf_paths(args.pdf_paths)
+    if not pdf_paths:
         return
 
+    # --- Configuration ---
     # Load configuration from config.yaml located in the script's directory
-    config_path = os.path.join(script_dir, "config.yaml")
-    with open(config_path, 'r') as f:
-        config = yaml.safe_load(f)
+    config = _load_config(SCRIPT_DIR / "config.yaml")
 
     # --- Path Setup ---
-    bibtex_path = os.path.join(script_dir, config.get("bibtex_path"))
+    bibtex_path = SCRIPT_DIR / config.get("bibtex_path")
 
     if args.output_dir:
         # Use the user-specified output directory
-        output_dir = args.output_dir
+        output_dir = Path(args.output_dir)
         json_output_dir = output_dir
         csv_output_dir = output_dir
         md_output_dir = output_dir
     else:
         # Use directories from config.yaml, relative to the script directory
-        json_output_dir = os.path.join(script_dir, config.get("json_output_dir"))
-        csv_output_dir = os.path.join(script_dir, config.get("csv_output_dir"))
-        md_output_dir = os.path.join(script_dir, config.get("md_output_dir"))
+        json_output_dir = SCRIPT_DIR / config.get("json_output_dir")
+        csv_output_dir = SCRIPT_DIR / config.get("csv_output_dir")
+        md_output_dir = SCRIPT_DIR / config.get("md_output_dir")
 
-    # Create output directories if they don't exist
-    os.makedirs(json_output_dir, exist_ok=True)
+    # Create output directories once, before any worker starts
+    if not args.no_json:
+        json_output_dir.mkdir(parents=True, exist_ok=True)
     if not args.no_csv:
-        os.makedirs(csv_output_dir, exist_ok=True)
+        csv_output_dir.mkdir(parents=True, exist_ok=True)
     if not args.no_md:
-        os.makedirs(md_output_dir, exist_ok=True)
+        md_output_dir.mkdir(parents=True, exist_ok=True)
 
-    # --- File Naming ---
-    base_filename = os.path.splitext(os.path.basename(args.pdf_path))[0]
-    json_path = os.path.join(json_output_dir, f"{base_filename}.json")
+    run_one = partial(
+        process_pdf,
+        bibtex_path=bibtex_path,
+        json_output_dir=json_output_dir,
+        csv_output_dir=csv_output_dir,
+        md_output_dir=md_output_dir,
+        no_csv=args.no_csv,
+        no_md=args.no_md,
+        no_json=args.no_json,
+    )
 
-    # --- Run Pipeline ---
-    # 1. Create enriched JSON (source of truth)
-    json_status = None
-    csv_status = None
-    md_status = None
-    highlight_count = 0
-    output_display_name = base_filename
+    # PDFs are independent, so a batch is spread across processes
+    workers = max(1, min(args.workers or os.cpu_count() or 1, len(pdf_paths)))
+    if workers == 1:
+        # Load the BibTeX on a thread while the first PDF is being read;
+        # every file then shares the same parsed database
+        from bibtex_cache import BackgroundBibtexLoad
 
-    create_enriched_json(args.pdf_path, bibtex_path, json_path)
+        bib_loader = BackgroundBibtexLoad(bibtex_path)
+        results = [run_one(p, bib_loader=bib_loader) for p in pdf_paths]
+    else:
+        # Parse the BibTeX once here so every worker starts from the
+        # on-disk cache instead of parsing it in parallel. This runs even
+        # if no PDF turns out to have highlights; with a warm cache it is
+        # a single unpickle, so only the first run after a .bib edit pays
+        from bibtex_cache import load_bibtex_cached
 
-    # 2. Create other exports from the JSON file
-    if os.path.exists(json_path):
         try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                enriched_data = json.load(f)
+            load_bibtex_cached(bibtex_path)
         except Exception:
-            enriched_data = None
-
-        if enriched_data:
-            annotations = enriched_data.get("data", [])
-            highlight_count = len(annotations)
-            meta = enriched_data.get("meta", {})
-            citation_key = meta.get("citation_key", base_filename)
-            entry_type = meta.get("entry_type", "").lower()
-
-            # Construct new base_filename based on naming convention
-            if citation_key and entry_type:
-                output_display_name = f"{citation_key} {entry_type}-pdf"
-            else:
-                output_display_name = base_filename
-
-            # JSON status: warn if BibTeX metadata wasn't found/complete
-            meta_complete = bool(meta.get("citation_key")) and bool(meta.get("title")) and bool(meta.get("year"))
-            json_status = "success" if meta_complete else "warning"
-
-            # Create exports if not disabled
-            if not args.no_csv:
-                csv_path = os.path.join(csv_output_dir, f"{output_display_name}.csv")
-                try:
-                    if highlight_count > 0:
-                        create_readwise_csv(json_path, csv_path)
-                        csv_status = "success" if os.path.exists(csv_path) else "failed"
-                    else:
-                        # export_csv.py skips when no annotations
-                        csv_status = "warning"
-                except Exception:
-                    csv_status = "failed"
-
-            if not args.no_md:
-                md_path = os.path.join(md_output_dir, f"{output_display_name}.md")
-                try:
-                    if highlight_count > 0:
-                        create_markdown_export(json_path, md_path)
-                        md_status = "success" if os.path.exists(md_path) else "failed"
-                    else:
-                        # export_md.py skips when no annotations
-                        md_status = "warning"
-                except Exception:
-                    md_status = "failed"
-        else:
-            json_status = "failed"
-    else:
-        json_status = "failed"
+            # Workers report the problem per PDF
+            pass
+        chunksize = max(1, len(pdf_paths) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            results = list(ex.map(run_one, pdf_paths, chunksize=chunksize))
 
     # 3. Show macOS dialog summary (best-effort)
     elapsed = time.time() - start_time
-    # Classify outcome for single-file run
-    success_count = 1 if json_status == "success" and (csv_status in (None, "success", "warning")) and (md_status in (None, "success", "warning")) else 0
-    fail_count = 1 if json_status == "failed" or csv_status == "failed" or md_status == "failed" else 0
-    issue_count = 1 if not fail_count and (
-        json_status == "warning" or csv_status == "warning" or md_status == "warning" or highlight_count == 0
-    ) else 0
+    success_count = issue_count = fail_count = 0
+    for result in results:
+        success, issue, fail = _classify(result)
+        success_count += success
+        issue_count += issue
+        fail_count += fail
+
+    # Per-format statuses are only meaningful for a single-file run
+    single: Optional[Dict[str, Any]] = results[0] if len(results) == 1 else None
 
     try:
         show_final_dialog(
-            file_name=output_display_name,
-            highlight_count=highlight_count,
-            json_status=json_status,
-            csv_status=csv_status,
-            md_status=md_status,
+            file_name=single["file_name"] if single else f"{len(results)} PDFs",
+            highlight_count=sum(r["highlight_count"] for r in results),
+            json_status=single["json_status"] if single else None,
+            csv_status=single["csv_status"] if single else None,
+            md_status=single["md_status"] if single else None,
             success_count=success_count,
             issue_count=issue_count,
             fail_count=fail_count,
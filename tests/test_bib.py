@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bib import normalize_meta
+
+
+@pytest.mark.parametrize(
+    "raw, expected",
+    [
+        ("Title: Subtitle", "Title – Subtitle"),
+        ("Title - Subtitle", "Title – Subtitle"),
+        ("Many   spaces\tand\nnewlines", "Many spaces and newlines"),
+        # Adjacent separators normalize as the old replace/sub/sub chain did
+        ("a:  :b", "a – – b"),
+        ("Word —: Sub", "Word – – Sub"),
+        ("Trailing colon:", "Trailing colon –"),
+    ],
+)
+def test_normalize_meta_title_separators(raw, expected):
+    assert normalize_meta({"title": raw})["title"] == expected
@@ -1,3 +1,20 @@
+import os
+import shutil
+import sys
+
+# Resolved once at import; None off macOS or when osascript isn't on PATH
+_OSASCRIPT = shutil.which("osascript") if sys.platform == "darwin" else None
+
+_DIALOG_SCRIPT = (
+    'display dialog "{body}" '
+    'buttons {{"OK"}} default button "OK" '
+    'with title "PDF Highlight Extraction"'
+)
+
+# Escapes backslashes and double quotes for an AppleScript string literal
+_APPLESCRIPT_ESCAPE = str.maketrans({"\\": "\\\\", '"': '\\"'})
+
+
 def show_final_dialog(
     file_name: str,
     highlight_count: int,
@@ -11,59 +28,52 @@ def show_final_dialog(
 ):
     """Show a macOS dialog summarizing the run.
 
-    Falls back to printing to stdout if osascript is unavailable.
+    The dialog is launched in the background and not waited on. Falls back
+    to printing to stdout if osascript is unavailable or when running under
+    CI (``$CI`` set).
     """
-    import subprocess
-
     # Format elapsed time as Xm Ys
     time_min = int(elapsed_sec // 60)
     time_sec = int(elapsed_sec % 60)
     time_str = f"{time_min}m {time_sec}s" if time_min else f"{time_sec}s"
 
-    # Build message body
-    lines: list[str] = []
-    lines.append("PDF Highlight Extraction Summary\n")
-    lines.append(f"📄 File Name: {file_name}")
-    lines.append(f"🔦 Highlights exported: {highlight_count}\n")
-
-    if json_status:
-        lines.append(f"🗒️ JSON exported:       {json_status}")
-    if csv_status:
-        lines.append(f"📊 CSV exported:        {csv_status}")
-    if md_status:
-        lines.append(f"📑 Markdown exported:   {md_status}")
-    lines.append("")
-
-    if success_count:
-        lines.append(f"✅ Files processed successfully: {success_count}")
-    if issue_count:
-        lines.append(f"⚠️ Files with issues: {issue_count}")
-    if fail_count:
-        lines.append(f"❌ Files failed: {fail_count}")
-    lines.append("")
-    lines.append(f"🕒 Time elapsed: {time_str}")
+    # Build message body; optional lines are empty when their value is unset
+    body = (
+        "PDF Highlight Extraction Summary\n\n"
+        f"📄 File Name: {file_name}\n"
+        f"🔦 Highlights exported: {highlight_count}\n\n"
+        + (f"🗒️ JSON exported:       {json_status}\n" if json_status else "")
+        + (f"📊 CSV exported:        {csv_status}\n" if csv_status else "")
+        + (f"📑 Markdown exported:   {md_status}\n" if md_status else "")
+        + "\n"
+        + (f"✅ Files processed successfully: {success_count}\n" if success_count else "")
+        + (f"⚠️ Files with issues: {issue_count}\n" if issue_count else "")
+        + (f"❌ Files failed: {fail_count}\n" if fail_count else "")
+        + f"\n🕒 Time elapsed: {time_str}"
+    )
 
-    body = "\n".join(lines)
+    # Headless runs go straight to the printed summary without spawning
+    if _OSASCRIPT is not None and not os.environ.get("CI"):
+        import subprocess
 
-    # Escape for AppleScript string literal
-    body_escaped = body.replace("\\", "\\\\").replace('"', '\\"')
+        # Escape for AppleScript string literal
+        body_escaped = body.translate(_APPLESCRIPT_ESCAPE)
+        applescript = _DIALOG_SCRIPT.format(body=body_escaped)
 
-    applescript = (
-        f'display dialog "{body_escaped}" '
-        f'buttons {{"OK"}} default button "OK" '
-        f'with title "PDF Highlight Extraction"'
-    )
+        try:
+            # The dialog is informational only: start osascript in its own
+            # session and return without waiting for it
+            subprocess.Popen(
+                [_OSASCRIPT, "-e", applescript],
+                start_new_session=True,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            return
+        except OSError:
+            pass
 
-    try:
-        result = subprocess.run(
-            ["osascript", "-e", applescript],
-            check=False,
-            capture_output=True,
-            text=True,
-        )
-        if result.returncode != 0:
-            raise RuntimeError(result.stderr.strip() or "osascript failed")
-    except Exception:
-        # Fallback: just print to terminal
-        print("\n=== PDF Highlight Extraction Summary ===\n")
-        print(body)
+    # Fallback: just print to terminal
+    print("\n=== PDF Highlight Extraction Summary ===\n")
+    print(body)